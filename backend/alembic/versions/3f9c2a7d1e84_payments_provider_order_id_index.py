@@ -0,0 +1,30 @@
+"""payments: covering index on provider_order_id
+
+Revision ID: 3f9c2a7d1e84
+Revises: 7b1892983079
+Create Date: 2026-10-14 10:12:31.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1e84'
+down_revision = '7b1892983079'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Webhooks resolve payments by provider_order_id alone; INCLUDE keeps the
+    # tenant/appointment/status reads on the index.
+    op.create_index(
+        'ix_payments_provider_order_id',
+        'payments',
+        ['provider_order_id'],
+        unique=False,
+        postgresql_include=['tenant_id', 'appointment_id', 'status'],
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_provider_order_id', table_name='payments')
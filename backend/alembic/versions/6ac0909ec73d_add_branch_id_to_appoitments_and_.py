@@ -4,10 +4,16 @@ Revision ID: 6ac0909ec73d
 Revises: 56b119308afc
 Create Date: 2026-02-17 12:36:48.345107
 
+Recovery: the column adds and the paged backfill commit as they go (autocommit
+block), so a failure partway leaves branch_id partly filled with the version
+not bumped. Just re-run `alembic upgrade`: the columns are added IF NOT EXISTS
+and the backfill only touches rows still NULL, so it resumes where it stopped.
+
+Online only: the backfill reads each page boundary back from the database, so
+`alembic upgrade --sql` (offline mode) is not supported for this revision.
 """
 from alembic import op
 import sqlalchemy as sa
-from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = '6ac0909ec73d'
@@ -15,52 +21,115 @@ down_revision = '56b119308afc'
 branch_labels = None
 depends_on = None
 
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def _backfill_in_batches(table: str, alias: str, update_sql: str) -> None:
+    """
+    Run `update_sql` over `table` one page of primary keys at a time.
+
+    Ids are UUIDs, so pages are keyset ranges (after, hi] over the rows that
+    still have branch_id IS NULL rather than fixed-width numeric ranges.
+    `update_sql` must contain a `{page}` placeholder for the range predicate.
+    """
+    bind = op.get_bind()
+    after = None
+    while True:
+        params = {"skip": BACKFILL_BATCH_SIZE - 1}
+        lower = ""
+        if after is not None:
+            lower = f"AND {alias}.id > :after"
+            params["after"] = after
+
+        hi = bind.execute(
+            sa.text(
+                f"SELECT {alias}.id FROM {table} {alias} "
+                f"WHERE {alias}.branch_id IS NULL {lower} "
+                f"ORDER BY {alias}.id OFFSET :skip LIMIT 1"
+            ),
+            params,
+        ).scalar()
+
+        upper = ""
+        if hi is not None:
+            upper = f"AND {alias}.id <= :hi"
+            params["hi"] = hi
+
+        params.pop("skip")
+        bind.execute(sa.text(update_sql.format(page=f"{lower} {upper}")), params)
+
+        if hi is None:
+            return
+        after = hi
+
+
 def upgrade():
-    # 1) add nullable columns first
-    op.add_column("appointments", sa.Column("branch_id", postgresql.UUID(as_uuid=True), nullable=True))
-    op.add_column("payments", sa.Column("branch_id", postgresql.UUID(as_uuid=True), nullable=True))
-
-    # 2) backfill
-    op.execute("""
-        UPDATE appointments a
-        SET branch_id = b.id
-        FROM branches b
-        WHERE a.tenant_id = b.tenant_id
-          AND b.id = (
-            SELECT id FROM branches b2
-            WHERE b2.tenant_id = a.tenant_id
-            ORDER BY b2.id ASC
-            LIMIT 1
-          )
-          AND a.branch_id IS NULL;
-    """)
-
-    op.execute("""
-        UPDATE payments p
-        SET branch_id = a.branch_id
-        FROM appointments a
-        WHERE p.appointment_id = a.id
-          AND p.branch_id IS NULL;
-    """)
-
-    op.execute("""
-        UPDATE payments p
-        SET branch_id = b.id
-        FROM branches b
-        WHERE p.tenant_id = b.tenant_id
-          AND b.id = (
-            SELECT id FROM branches b2
-            WHERE b2.tenant_id = p.tenant_id
-            ORDER BY b2.id ASC
-            LIMIT 1
-          )
-          AND p.branch_id IS NULL;
-    """)
+    if op.get_context().as_sql:
+        raise RuntimeError("6ac0909ec73d pages its backfill with live queries; run it online, not with --sql")
+
+    # 1) add nullable columns first (IF NOT EXISTS: re-runnable after a failed backfill)
+    op.execute("ALTER TABLE appointments ADD COLUMN IF NOT EXISTS branch_id UUID")
+    op.execute("ALTER TABLE payments ADD COLUMN IF NOT EXISTS branch_id UUID")
+
+    # 2) backfill in primary-key pages; autocommit so every page commits on its own
+    #    instead of rewriting both tables inside the migration transaction
+    with op.get_context().autocommit_block():
+        # transient partial indexes over the not-yet-filled rows; each page
+        # probe then walks only what is still NULL instead of the whole table
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_appt_branch_null "
+            "ON appointments (id, tenant_id) WHERE branch_id IS NULL"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_branch_null "
+            "ON payments (id, tenant_id) WHERE branch_id IS NULL"
+        )
+
+        _backfill_in_batches("appointments", "a", """
+            WITH first_branch AS MATERIALIZED (
+                SELECT DISTINCT ON (tenant_id) tenant_id, id
+                FROM branches
+                ORDER BY tenant_id, id
+            )
+            UPDATE appointments a
+            SET branch_id = fb.id
+            FROM first_branch fb
+            WHERE a.tenant_id = fb.tenant_id
+              AND a.branch_id IS NULL
+              {page};
+        """)
+
+        _backfill_in_batches("payments", "p", """
+            UPDATE payments p
+            SET branch_id = a.branch_id
+            FROM appointments a
+            WHERE p.appointment_id = a.id
+              AND p.branch_id IS NULL
+              {page};
+        """)
+
+        _backfill_in_batches("payments", "p", """
+            WITH first_branch AS MATERIALIZED (
+                SELECT DISTINCT ON (tenant_id) tenant_id, id
+                FROM branches
+                ORDER BY tenant_id, id
+            )
+            UPDATE payments p
+            SET branch_id = fb.id
+            FROM first_branch fb
+            WHERE p.tenant_id = fb.tenant_id
+              AND p.branch_id IS NULL
+              {page};
+        """)
 
     # 3) enforce NOT NULL
     op.alter_column("appointments", "branch_id", nullable=False)
     op.alter_column("payments", "branch_id", nullable=False)
 
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_appt_branch_null")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_payments_branch_null")
+
     # 4) add foreign keys
     op.create_foreign_key(
         "fk_appointments_branch_id",
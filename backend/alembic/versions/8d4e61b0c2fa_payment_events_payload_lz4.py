@@ -0,0 +1,24 @@
+"""payment_events: lz4 compression for payload
+
+Revision ID: 8d4e61b0c2fa
+Revises: 3f9c2a7d1e84
+Create Date: 2026-10-14 11:05:47.902316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e61b0c2fa'
+down_revision = '3f9c2a7d1e84'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # PG14+. Storage stays EXTENDED (compressed, then TOASTed); EXTERNAL would
+    # disable compression. Applies to newly written rows only.
+    op.execute("ALTER TABLE payment_events ALTER COLUMN payload SET COMPRESSION lz4")
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE payment_events ALTER COLUMN payload SET COMPRESSION pglz")
@@ -0,0 +1,69 @@
+"""payments: store amount as bigint paisa
+
+Revision ID: 9a6d3f1b5c28
+Revises: e4b7a2c9f613
+Create Date: 2026-10-14 15:48:20.146592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a6d3f1b5c28'
+down_revision = 'e4b7a2c9f613'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        raise RuntimeError("9a6d3f1b5c28 pages its backfill with live queries; run it online, not with --sql")
+
+    bind = op.get_bind()
+    # add + backfill in primary-key pages, each committed on its own (same scheme as
+    # 6ac0909ec73d) instead of one UPDATE rewriting all of payments in one transaction
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE payments ADD COLUMN IF NOT EXISTS amount_paisa BIGINT")
+        after = None
+        while True:
+            params = {"skip": BACKFILL_BATCH_SIZE - 1}
+            lower = ""
+            if after is not None:
+                lower = "AND id > :after"
+                params["after"] = after
+
+            hi = bind.execute(
+                sa.text(f"SELECT id FROM payments WHERE true {lower} ORDER BY id OFFSET :skip LIMIT 1"),
+                params,
+            ).scalar()
+
+            upper = ""
+            if hi is not None:
+                upper = "AND id <= :hi"
+                params["hi"] = hi
+
+            params.pop("skip")
+            bind.execute(
+                sa.text(
+                    "UPDATE payments SET amount_paisa = round(amount * 100)::bigint "
+                    f"WHERE amount_paisa IS NULL {lower} {upper}"
+                ),
+                params,
+            )
+            if hi is None:
+                break
+            after = hi
+
+    # rows inserted by the old code while the pages ran
+    op.execute("UPDATE payments SET amount_paisa = round(amount * 100)::bigint WHERE amount_paisa IS NULL")
+    op.alter_column('payments', 'amount_paisa', existing_type=sa.BigInteger(), nullable=False)
+    op.drop_column('payments', 'amount')
+
+def downgrade() -> None:
+    op.add_column('payments', sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=True))
+    op.execute("UPDATE payments SET amount = amount_paisa / 100.0")
+    op.alter_column('payments', 'amount', existing_type=sa.Numeric(precision=10, scale=2), nullable=False)
+    op.drop_column('payments', 'amount_paisa')
@@ -0,0 +1,30 @@
+"""staff: partial (tenant_id, is_active) index for active-staff listing
+
+Revision ID: b3f8e6d2a417
+Revises: 9a6d3f1b5c28
+Create Date: 2026-10-14 16:21:09.553810
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8e6d2a417'
+down_revision = '9a6d3f1b5c28'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_staff_tenant_active "
+            "ON staff (tenant_id, is_active) "
+            "INCLUDE (id, full_name, role, work_start_time, work_end_time) "
+            "WHERE is_active = true"
+        )
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_staff_tenant_active")
@@ -0,0 +1,23 @@
+"""payment_events: index provider_event_id for webhook dedup
+
+Revision ID: c5e2f8a91d37
+Revises: 8d4e61b0c2fa
+Create Date: 2026-10-14 12:20:11.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2f8a91d37'
+down_revision = '8d4e61b0c2fa'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # the webhook dedups before the tenant is known, so ix_payment_events_tenant_event can't serve it
+    op.create_index('ix_payment_events_provider_event_id', 'payment_events', ['provider_event_id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_payment_events_provider_event_id', table_name='payment_events')
@@ -0,0 +1,27 @@
+"""payments: receipt_sent_at, refund_id, refund_status columns
+
+Revision ID: d7c1a5e8b942
+Revises: b3f8e6d2a417
+Create Date: 2026-10-14 17:36:52.208114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7c1a5e8b942'
+down_revision = 'b3f8e6d2a417'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # declared outside the Payment class until now, so no earlier migration created them
+    op.add_column('payments', sa.Column('receipt_sent_at', sa.DateTime(), nullable=True))
+    op.add_column('payments', sa.Column('refund_id', sa.String(length=255), nullable=True))
+    op.add_column('payments', sa.Column('refund_status', sa.String(length=50), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('payments', 'refund_status')
+    op.drop_column('payments', 'refund_id')
+    op.drop_column('payments', 'receipt_sent_at')
@@ -0,0 +1,46 @@
+"""payments: created_at timestamptz with server default, (tenant_id, created_at DESC) index
+
+Revision ID: e4b7a2c9f613
+Revises: c5e2f8a91d37
+Create Date: 2026-10-14 15:02:38.771904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7a2c9f613'
+down_revision = 'c5e2f8a91d37'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # existing values were written with datetime.utcnow, i.e. naive UTC
+    op.alter_column(
+        'payments',
+        'created_at',
+        existing_type=sa.DateTime(),
+        type_=sa.DateTime(timezone=True),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+        server_default=sa.text('now()'),
+        existing_nullable=False,
+    )
+    op.create_index(
+        'ix_payments_tenant_created_at',
+        'payments',
+        ['tenant_id', sa.text('created_at DESC')],
+        unique=False,
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_payments_tenant_created_at', table_name='payments')
+    op.alter_column(
+        'payments',
+        'created_at',
+        existing_type=sa.DateTime(timezone=True),
+        type_=sa.DateTime(),
+        postgresql_using="created_at AT TIME ZONE 'UTC'",
+        server_default=None,
+        existing_nullable=False,
+    )
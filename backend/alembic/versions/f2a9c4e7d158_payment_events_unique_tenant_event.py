@@ -0,0 +1,40 @@
+"""payment_events: unique (tenant_id, provider_event_id) for idempotent webhook inserts
+
+Revision ID: f2a9c4e7d158
+Revises: d7c1a5e8b942
+Create Date: 2026-10-15 10:12:44.730521
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a9c4e7d158'
+down_revision = 'd7c1a5e8b942'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # the old check-then-insert could race; keep the earliest copy of any duplicate
+    op.execute(
+        "DELETE FROM payment_events a USING payment_events b "
+        "WHERE a.provider_event_id IS NOT NULL "
+        "AND a.tenant_id = b.tenant_id AND a.provider_event_id = b.provider_event_id "
+        "AND (a.created_at, a.id) > (b.created_at, b.id)"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_payment_events_tenant_event "
+            "ON payment_events (tenant_id, provider_event_id)"
+        )
+        # same columns, now redundant
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_payment_events_tenant_event")
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payment_events_tenant_event "
+            "ON payment_events (tenant_id, provider_event_id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_payment_events_tenant_event")
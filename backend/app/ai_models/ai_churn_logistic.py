@@ -1,5 +1,6 @@
+import os
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -11,7 +12,11 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, precision_recall_fscore_support
 
-from .config import CHURN_MODEL_PATH
+from .config import CHURN_MODEL_PATH, CHURN_LINEAR_PATH
+from .storage import save_npz, load_npz
+
+
+FEATURES = ["days_since_last_visit", "total_visits", "avg_spending", "cancellation_frequency"]
 
 
 @dataclass
@@ -45,19 +50,22 @@ def load_churn_from_csv(csv_path: str) -> pd.DataFrame:
 
 
 def build_pipeline(cfg: ChurnConfig) -> Pipeline:
-    model = LogisticRegression(class_weight=cfg.class_weight, max_iter=2000)
+    # 4 dense features: liblinear's coordinate descent converges far faster than lbfgs,
+    # and a loose tol is plenty since we only threshold the probability.
+    model = LogisticRegression(solver="liblinear", class_weight=cfg.class_weight, max_iter=500, tol=1e-3)
     return Pipeline([("scaler", StandardScaler()), ("model", model)])
 
 
 def train_churn_model(df: pd.DataFrame, cfg: ChurnConfig) -> Dict[str, Any]:
-    X = df[["days_since_last_visit", "total_visits", "avg_spending", "cancellation_frequency"]].copy()
-    y = df["churn"].astype(int).copy()
+    # Fit on plain ndarrays (FEATURES order) so scoring can pass arrays without feature names
+    X = df[FEATURES].to_numpy(dtype=float)
+    y = df["churn"].astype(int).to_numpy()
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, y,
         test_size=cfg.test_size,
         random_state=cfg.random_state,
-        stratify=y if y.nunique() > 1 else None
+        stratify=y if len(np.unique(y)) > 1 else None
     )
 
     pipe = build_pipeline(cfg)
@@ -66,13 +74,15 @@ def train_churn_model(df: pd.DataFrame, cfg: ChurnConfig) -> Dict[str, Any]:
     probs = pipe.predict_proba(X_test)[:, 1]
     preds = (probs >= cfg.threshold_high_risk).astype(int)
 
-    auc = roc_auc_score(y_test, probs) if y_test.nunique() > 1 else float("nan")
+    auc = roc_auc_score(y_test, probs) if len(np.unique(y_test)) > 1 else float("nan")
     pr, rc, f1, _ = precision_recall_fscore_support(y_test, preds, average="binary", zero_division=0)
 
     dump(pipe, CHURN_MODEL_PATH)
+    export_churn_linear(pipe)
 
     return {
         "saved_model_path": CHURN_MODEL_PATH,
+        "saved_linear_path": CHURN_LINEAR_PATH,
         "rows_used": int(len(df)),
         "roc_auc": float(auc),
         "precision": float(pr),
@@ -88,16 +98,68 @@ def load_churn_model() -> Pipeline:
     return load(CHURN_MODEL_PATH)
 
 
+def fold_churn_linear(pipe: Pipeline) -> Tuple[np.ndarray, float]:
+    """
+    Fold the fitted StandardScaler into the LR weights:
+    w' = w / scale, b' = b - sum(w * mean / scale), so that
+    sigmoid(X @ w' + b') == pipe.predict_proba(X)[:, 1].
+    """
+    scaler = pipe.named_steps["scaler"]
+    lr = pipe.named_steps["model"]
+    w = lr.coef_[0] / scaler.scale_
+    b = float(lr.intercept_[0] - (lr.coef_[0] * scaler.mean_ / scaler.scale_).sum())
+    return w, b
+
+
+def export_churn_linear(pipe: Pipeline) -> None:
+    w, b = fold_churn_linear(pipe)
+    save_npz(CHURN_LINEAR_PATH, w=w, b=np.array(b))
+
+
+class ChurnScorer:
+    """
+    Churn model reduced to one dot product + sigmoid (see fold_churn_linear).
+    Exposes predict_proba() so it can stand in for the sklearn Pipeline.
+    """
+
+    def __init__(self, path: str = CHURN_LINEAR_PATH):
+        arrays = load_npz(path)
+        self.w = arrays["w"]
+        self.b = float(arrays["b"])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-(np.asarray(X, dtype=float) @ self.w + self.b)))
+        return np.column_stack([1.0 - p, p])
+
+
+_scorer_cache: Dict[str, Any] = {}
+
+
+def load_churn_scorer() -> ChurnScorer:
+    """Process-wide ChurnScorer, rebuilt only when the model is retrained."""
+    if not os.path.exists(CHURN_LINEAR_PATH):
+        # model trained before the folded weights existed: derive them from the joblib once
+        export_churn_linear(load_churn_model())
+    mtime = os.path.getmtime(CHURN_LINEAR_PATH)
+    if _scorer_cache.get("mtime") != mtime:
+        _scorer_cache["scorer"] = ChurnScorer(CHURN_LINEAR_PATH)
+        _scorer_cache["mtime"] = mtime
+    return _scorer_cache["scorer"]
+
+
+def score_customers_batch(pipe: Pipeline | ChurnScorer, X: np.ndarray, threshold_high_risk: float = 0.7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score an (N, 4) array of customers (columns in FEATURES order) in one predict_proba call.
+    Returns (churn_probabilities, risk_levels).
+    """
+    probs = pipe.predict_proba(X)[:, 1]
+    risk = np.where(probs > threshold_high_risk, "HIGH", np.where(probs >= 0.4, "MEDIUM", "LOW"))
+    return probs, risk
+
+
 def score_customer(features: Dict[str, float], threshold_high_risk: float = 0.7) -> Dict[str, Any]:
-    pipe = load_churn_model()
-
-    X = pd.DataFrame([{
-        "days_since_last_visit": float(features["days_since_last_visit"]),
-        "total_visits": float(features["total_visits"]),
-        "avg_spending": float(features["avg_spending"]),
-        "cancellation_frequency": float(features["cancellation_frequency"]),
-    }])
-
-    prob = float(pipe.predict_proba(X)[0, 1])
-    risk = "HIGH" if prob > threshold_high_risk else ("MEDIUM" if prob >= 0.4 else "LOW")
-    return {"churn_probability": prob, "risk_level": risk, "threshold_high_risk": threshold_high_risk}
+    pipe = load_churn_scorer()
+
+    X = np.array([[float(features[c]) for c in FEATURES]])
+    probs, risk = score_customers_batch(pipe, X, threshold_high_risk)
+    return {"churn_probability": float(probs[0]), "risk_level": str(risk[0]), "threshold_high_risk": threshold_high_risk}
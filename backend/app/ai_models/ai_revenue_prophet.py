@@ -1,12 +1,18 @@
-from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, Any, Optional
 
 import numpy as np
 import pandas as pd
-from prophet import Prophet
 
-from .storage import save_pickle, load_pickle, save_json
-from .config import REVENUE_MODEL_PATH, REVENUE_FORECAST_PATH
+if TYPE_CHECKING:
+    from prophet import Prophet
+
+from .storage import save_pickle, load_pickle, save_json, load_json
+from .config import REVENUE_MODEL_PATH, REVENUE_MODEL_META_PATH, REVENUE_FORECAST_PATH
 
 
 @dataclass
@@ -21,26 +27,33 @@ class RevenueConfig:
 
 
 def load_revenue_from_csv(csv_path: str) -> pd.DataFrame:
-    df = pd.read_csv(csv_path)
+    # pyarrow parses multi-threaded straight into typed columns, so the
+    # coercions below are cheap no-ops for well-formed files
+    df = pd.read_csv(csv_path, engine="pyarrow")
     if "date" not in df.columns or "revenue" not in df.columns:
         raise ValueError(f"CSV must contain date,revenue columns. Found: {list(df.columns)}")
 
     df = df.rename(columns={"date": "ds", "revenue": "y"})
     df["ds"] = pd.to_datetime(df["ds"], errors="coerce")
     df["y"] = pd.to_numeric(df["y"], errors="coerce")
-    df = df.dropna(subset=["ds", "y"]).sort_values("ds")
-    df = df[df["y"] >= 0]
-    return df
+
+    # one validity mask (NaN y compares False, so y >= 0 also drops it) + one stable sort
+    m = df["ds"].notna() & (df["y"] >= 0)
+    return df.loc[m].sort_values("ds", kind="mergesort", ignore_index=True)
 
 
 def fill_missing_days(df: pd.DataFrame) -> pd.DataFrame:
-    all_days = pd.date_range(df["ds"].min(), df["ds"].max(), freq="D")
-    out = df.set_index("ds").reindex(all_days).rename_axis("ds").reset_index()
-    out["y"] = out["y"].fillna(0.0)
-    return out
+    s = df.set_index("ds")["y"].resample("D").asfreq(fill_value=0.0)
+    return s.rename_axis("ds").reset_index()
 
 
 def train_prophet(df: pd.DataFrame, cfg: RevenueConfig) -> Prophet:
+    # prophet pulls in matplotlib.pyplot at import; keep it (and GUI backend probing)
+    # off the API/worker import path and load it headless only when we actually fit
+    import matplotlib
+    matplotlib.use("Agg")
+    from prophet import Prophet
+
     model = Prophet(
         weekly_seasonality=cfg.weekly_seasonality,
         yearly_seasonality=cfg.yearly_seasonality,
@@ -53,6 +66,26 @@ def train_prophet(df: pd.DataFrame, cfg: RevenueConfig) -> Prophet:
     return model
 
 
+def training_key(df: pd.DataFrame, cfg: RevenueConfig) -> str:
+    """Fingerprint of the training series + fit params (horizon only affects predict)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(df[["ds", "y"]], index=False).to_numpy().tobytes())
+    params = {k: v for k, v in asdict(cfg).items() if k != "horizon_days"}
+    h.update(json.dumps(params, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def load_cached_revenue_model(key: str) -> Optional[Prophet]:
+    """Return the saved model if it was fit on the same inputs, else None."""
+    try:
+        meta = load_json(REVENUE_MODEL_META_PATH)
+        if meta.get("training_key") != key:
+            return None
+        return load_pickle(REVENUE_MODEL_PATH)
+    except FileNotFoundError:
+        return None
+
+
 def forecast(model: Prophet, horizon_days: int) -> pd.DataFrame:
     future = model.make_future_dataframe(periods=horizon_days, freq="D")
     fc = model.predict(future)
@@ -76,18 +109,33 @@ def promotion_suggestion(weekday: str) -> str:
     return "Targeted promo (combo pack / add-on service)"
 
 
+def promotion_suggestions(weekdays: pd.Series) -> np.ndarray:
+    """Vectorized promotion_suggestion() over a whole weekday column."""
+    wd = weekdays.astype(str).to_numpy()
+    return np.select(
+        [np.isin(wd, ["Tuesday", "Wednesday"]), wd == "Monday"],
+        ["Mid-week offer (5–10% off / bundle deal)", "Start-week boost (referral coupon / limited discount)"],
+        default="Targeted promo (combo pack / add-on service)",
+    )
+
+
 def train_and_save_revenue_model(
     revenue_df: pd.DataFrame,
     cfg: RevenueConfig,
 ) -> Dict[str, Any]:
     revenue_df = fill_missing_days(revenue_df)
-    model = train_prophet(revenue_df, cfg)
 
-    save_pickle(REVENUE_MODEL_PATH, model)
+    # Stan fit dominates; skip it when the data and params are unchanged
+    key = training_key(revenue_df, cfg)
+    model = load_cached_revenue_model(key)
+    if model is None:
+        model = train_prophet(revenue_df, cfg)
+        save_pickle(REVENUE_MODEL_PATH, model)
+        save_json(REVENUE_MODEL_META_PATH, {"training_key": key})
 
     fc = forecast(model, cfg.horizon_days)
     slow = identify_slow_days(fc, cfg.horizon_days, slow_quantile=0.20)
-    slow["promotion_suggestion"] = slow["weekday"].apply(lambda w: promotion_suggestion(str(w)))
+    slow["promotion_suggestion"] = promotion_suggestions(slow["weekday"])
 
     payload = {
         "horizon_days": cfg.horizon_days,
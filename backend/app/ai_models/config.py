@@ -11,5 +11,7 @@ os.makedirs(MODELS_DIR, exist_ok=True)
 os.makedirs(FORECASTS_DIR, exist_ok=True)
 
 CHURN_MODEL_PATH = os.path.join(MODELS_DIR, "churn_logistic.joblib")
+CHURN_LINEAR_PATH = os.path.join(MODELS_DIR, "churn_logistic_linear.npz")
 REVENUE_MODEL_PATH = os.path.join(MODELS_DIR, "revenue_prophet.pkl")
+REVENUE_MODEL_META_PATH = os.path.join(MODELS_DIR, "revenue_prophet.meta.json")
 REVENUE_FORECAST_PATH = os.path.join(FORECASTS_DIR, "revenue_forecast_latest.json")
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import numpy as np
 from fastapi import APIRouter, HTTPException, Query, Depends
 
 from app.core.deps import require_roles
@@ -9,7 +10,10 @@ from .schemas import (
     ChurnTrainRequest, ChurnScoreResponse,
 )
 from .ai_revenue_prophet import RevenueConfig, load_revenue_from_csv, train_and_save_revenue_model
-from .ai_churn_logistic import ChurnConfig, load_churn_from_csv, train_churn_model, score_customer
+from .ai_churn_logistic import (
+    FEATURES, ChurnConfig, load_churn_from_csv, train_churn_model,
+    load_churn_scorer, score_customer, score_customers_batch,
+)
 from .storage import load_json
 from .config import REVENUE_FORECAST_PATH
 
@@ -95,18 +99,19 @@ def churn_high_risk(threshold: float = Query(0.7, ge=0.0, le=1.0)):
         {"customer_id": 3, "days_since_last_visit": 90, "total_visits": 4, "avg_spending": 880, "cancellation_frequency": 0.29},
     ]
 
+    # Score everyone in a single predict_proba call
+    pipe = load_churn_scorer()
+    X = np.array([[float(c[f]) for f in FEATURES] for c in demo_customers])
+    probs, risk = score_customers_batch(pipe, X, threshold_high_risk=threshold)
+
     out = []
-    for c in demo_customers:
-        score = score_customer(
-            {
-                "days_since_last_visit": c["days_since_last_visit"],
-                "total_visits": c["total_visits"],
-                "avg_spending": c["avg_spending"],
-                "cancellation_frequency": c["cancellation_frequency"],
-            },
-            threshold_high_risk=threshold,
-        )
-        if score["churn_probability"] > threshold:
-            out.append({"customer_id": c["customer_id"], **score})
+    for c, prob, level in zip(demo_customers, probs, risk):
+        if prob > threshold:
+            out.append({
+                "customer_id": c["customer_id"],
+                "churn_probability": float(prob),
+                "risk_level": str(level),
+                "threshold_high_risk": threshold,
+            })
 
     return {"threshold": threshold, "high_risk_customers": out}
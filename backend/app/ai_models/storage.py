@@ -3,6 +3,8 @@ import os
 import pickle
 from typing import Any, Dict
 
+import numpy as np
+
 def save_json(path: str, data: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
@@ -14,6 +16,17 @@ def load_json(path: str) -> Dict[str, Any]:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def save_npz(path: str, **arrays: np.ndarray) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+def load_npz(path: str) -> Dict[str, np.ndarray]:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"NPZ not found: {path}")
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
 def save_pickle(path: str, obj: Any) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     with open(path, "wb") as f:
@@ -5,13 +5,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from app.models.staff import Staff
-from app.core.deps import get_db, get_token_payload, get_branch_id
+from app.core.deps import get_db, TokenCtx, get_token_ctx, get_branch_id
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.service import Service
 from app.models.appointment_service import AppointmentService
 from app.schemas.appointment import AppointmentCreateIn, AppointmentPatchIn
 from app.models.customer import Customer
-from app.workers.tasks import send_booking_email
+from app.workers.tasks import send_email
 
 router = APIRouter(prefix="/appointments")
 
@@ -50,14 +50,14 @@ def availability(
     day: str = Query(..., description="YYYY-MM-DD"),
     slot_step_min: int = Query(15, ge=5, le=60),
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
     """
     Returns available start times for a staff on a given day (branch-scoped).
     Uses staff working hours (work_start_time/work_end_time).
     """
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     staff_uuid = uuid.UUID(staff_user_id)
 
     try:
@@ -135,10 +135,10 @@ def availability(
 def create_appointment(
     body: AppointmentCreateIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     staff_uuid = uuid.UUID(body.staff_user_id)
     customer_uuid = uuid.UUID(body.customer_id)
@@ -216,14 +216,15 @@ def create_appointment(
         )
 
         # send immediately
-        send_booking_email.delay(customer.email, subject, email_body)
+        send_email.delay(customer.email, subject, email_body, purpose="booking")
 
         # reminder 24 hours before
         reminder_time = appt.start_at - timedelta(hours=24)
         # schedule only if reminder is in the future
         if reminder_time > datetime.utcnow():
-            send_booking_email.apply_async(
+            send_email.apply_async(
                 args=[customer.email, "Appointment Reminder ⏰", email_body],
+                kwargs={"purpose": "booking"},
                 eta=reminder_time,
             )
 
@@ -235,10 +236,10 @@ def patch_appointment(
     appointment_id: str,
     body: AppointmentPatchIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     appt_id = uuid.UUID(appointment_id)
 
     appt = db.scalar(
@@ -287,10 +288,10 @@ def patch_appointment(
 @router.get("/")
 def list_appointments(
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     q = select(Appointment).where(
         Appointment.tenant_id == tenant_id,
         Appointment.branch_id == branch_id,
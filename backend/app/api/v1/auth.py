@@ -9,7 +9,7 @@ from app.core.security import (
     verify_refresh_token_hash, hash_refresh_token
 )
 from app.models.user import User
-from app.core.deps import get_token_payload
+from app.core.deps import TokenCtx, get_token_ctx
 
 router = APIRouter(prefix="/auth")
 
@@ -63,8 +63,8 @@ def refresh_route(refresh_token: str, db: Session = Depends(get_db)):
     return TokenOut(access_token=new_access, refresh_token=new_refresh)
 
 @router.post("/logout")
-def logout(db: Session = Depends(get_db), payload: dict = Depends(get_token_payload)):
-    user = db.scalar(select(User).where(User.id == payload["sub"]))
+def logout(db: Session = Depends(get_db), ctx: TokenCtx = Depends(get_token_ctx)):
+    user = db.scalar(select(User).where(User.id == ctx.user_id))
     if user:
         user.refresh_token_hash = None
         db.add(user)
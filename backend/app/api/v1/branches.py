@@ -1,8 +1,7 @@
-import uuid
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from app.core.deps import get_db, get_token_payload, require_roles
+from app.core.deps import get_db, TokenCtx, get_token_ctx, require_roles
 from app.models.branch import Branch
 from app.schemas.branch import BranchCreateIn
 from app.models.user import UserRole
@@ -12,9 +11,9 @@ router = APIRouter(prefix="/branches")
 @router.get("")
 def list_branches(
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     rows = db.scalars(select(Branch).where(Branch.tenant_id == tenant_id)).all()
     return {"success": True, "data": {"items": [
         {"id": str(b.id), "name": b.name, "address": b.address} for b in rows
@@ -24,9 +23,9 @@ def list_branches(
 def create_branch(
     body: BranchCreateIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(require_roles(UserRole.OWNER, UserRole.MANAGER)),
+    ctx: TokenCtx = Depends(require_roles(UserRole.OWNER, UserRole.MANAGER)),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     b = Branch(tenant_id=tenant_id, name=body.name, address=body.address)
     db.add(b)
     db.commit()
@@ -1,13 +1,12 @@
 import uuid
 from decimal import Decimal
-from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy import select
+from sqlalchemy import and_, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.core.deps import get_branch_id, get_db, get_token_payload, require_roles
+from app.core.deps import TokenCtx, get_branch_id, get_db, get_token_ctx, require_roles
 from app.integration.razorpay import (
     verify_razorpay_checkout_signature,
     verify_razorpay_webhook_signature,
@@ -26,6 +25,7 @@ from app.schemas.payment import (
     RefundIn,
     RefundOut,
 )
+from app.services.razorpay_webhook_service import webhook_event_id
 
 
 router = APIRouter(prefix="/payments", tags=["Payments"])
@@ -35,55 +35,49 @@ router = APIRouter(prefix="/payments", tags=["Payments"])
 def create_razorpay_order(
     body: CreateRazorpayOrderIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id_str = payload.get("tenant_id")
-    if not tenant_id_str:
-        raise HTTPException(status_code=400, detail="Missing tenant_id in token")
-
-    try:
-        tenant_id = uuid.UUID(tenant_id_str)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid tenant_id format")
-
+    tenant_id = ctx.tenant_id
     appt_id = body.appointment_id
 
-    # ✅ Enforce tenant + branch
-    appt = db.scalar(
-        select(Appointment).where(
+    # ✅ Enforce tenant + branch; customer comes back in the same round trip
+    row = db.execute(
+        select(Appointment, Customer)
+        .outerjoin(
+            Customer,
+            and_(Customer.id == Appointment.customer_id, Customer.tenant_id == tenant_id),
+        )
+        .where(
             Appointment.tenant_id == tenant_id,
             Appointment.branch_id == branch_id,
             Appointment.id == appt_id,
         )
-    )
-    if not appt:
+    ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Appointment not found for this branch")
+    appt, customer = row
+
+    # Create Razorpay order. Called synchronously: the appointment changes below are
+    # only sent at commit (autoflush=False), so no row lock is held during the HTTPS call.
+    order = client.order.create({
+        "amount": body.amount_paisa,
+        "currency": body.currency,
+        "receipt": f"appt_{appt_id}",
+        "notes": {
+            "tenant_id": str(tenant_id),
+            "branch_id": str(branch_id),
+            "appointment_id": str(appt_id),
+        },
+    })
 
     # Set due on appointment
-    appt.amount_due = body.amount
+    appt.amount_due = Decimal(body.amount_paisa) / 100
     appt.currency = body.currency
     appt.payment_status = ApptPayStatus.UNPAID
 
-    # Create Razorpay order
-    order = client.order.create(
-        {
-            "amount": int(round(float(body.amount) * 100)),  # paisa
-            "currency": body.currency,
-            "receipt": f"appt_{appt_id}",
-            "notes": {
-                "tenant_id": str(tenant_id),
-                "branch_id": str(branch_id),
-                "appointment_id": str(appt_id),
-            },
-        }
-    )
     provider_order_id = order["id"]
 
-    customer = db.scalar(
-        select(Customer).where(Customer.tenant_id == tenant_id, Customer.id == appt.customer_id)
-    )
-
     # ✅ Create payment row WITH branch_id
     pay = Payment(
         tenant_id=tenant_id,
@@ -91,7 +85,7 @@ def create_razorpay_order(
         appointment_id=appt.id,
         customer_id=appt.customer_id,
         status=PaymentStatus.CREATED,
-        amount=body.amount,
+        amount_paisa=body.amount_paisa,
         currency=body.currency,
         provider=PaymentProvider.RAZORPAY,
         provider_order_id=provider_order_id,
@@ -122,7 +116,8 @@ def create_razorpay_order(
             "payment_id": str(pay.id),
             "provider": pay.provider,
             "provider_order_id": pay.provider_order_id,
-            "amount": float(pay.amount),
+            "amount_paisa": pay.amount_paisa,
+            "amount": pay.amount,
             "currency": pay.currency,
             "razorpay_key_id": settings.RAZORPAY_KEY_ID,
             "customer": {
@@ -135,12 +130,19 @@ def create_razorpay_order(
 
 
 @router.post("/razorpay/webhook")
-async def razorpay_webhook(request: Request, db: Session = Depends(get_db)):
+async def razorpay_webhook(
+    request: Request,
+    db: Session = Depends(get_db),
+):
     """
     Webhooks are unauthenticated. We must be extra careful:
     - Verify signature ✅
-    - Store event idempotently ✅
+    - Store event idempotently ✅ (apply_razorpay_webhook task)
     - Resolve payment safely (prefer tenant_id in notes) ✅
+
+    Razorpay retries slow deliveries, so we answer as soon as the signature and
+    dedup check pass and apply the writes in a Celery task, which retries on
+    failure (Razorpay won't redeliver once it has our 200).
     """
     raw = await request.body()
     sig = request.headers.get("X-Razorpay-Signature", "")
@@ -151,117 +153,20 @@ async def razorpay_webhook(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Invalid webhook signature")
 
     payload_json = await request.json()
-    event_type = payload_json.get("event", "")
-
-    payment_entity = ((payload_json.get("payload") or {}).get("payment") or {}).get("entity") or {}
-    order_entity = ((payload_json.get("payload") or {}).get("order") or {}).get("entity") or {}
-    refund_entity = ((payload_json.get("payload") or {}).get("refund") or {}).get("entity") or {}
-
-    # event_id: payment.id or order.id or refund.id
-    event_id = (
-        payment_entity.get("id")
-        or order_entity.get("id")
-        or refund_entity.get("id")
-        or None
-    )
 
-    provider_order_id = (
-        payment_entity.get("order_id")
-        or order_entity.get("id")
-        or refund_entity.get("order_id")
-        or ""
-    )
-    provider_payment_id = (
-        payment_entity.get("id")
-        or refund_entity.get("payment_id")
-        or ""
-    )
-    status = (
-        payment_entity.get("status")
-        or order_entity.get("status")
-        or refund_entity.get("status")
-        or ""
-    )
-
-    notes = payment_entity.get("notes") or order_entity.get("notes") or {}
-    tenant_id_str = notes.get("tenant_id")
-
-    pay = None
-
-    # ✅ Prefer tenant-scoped lookup
-    if tenant_id_str and provider_order_id:
-        try:
-            tenant_uuid = uuid.UUID(tenant_id_str)
-            pay = db.scalar(
-                select(Payment).where(
-                    Payment.tenant_id == tenant_uuid,
-                    Payment.provider_order_id == provider_order_id,
-                )
-            )
-        except Exception:
-            pay = None
-
-    # Fallback: provider_order_id only (less safe, but allows webhook recovery)
-    if not pay and provider_order_id:
-        pay = db.scalar(select(Payment).where(Payment.provider_order_id == provider_order_id))
-
-    if not pay:
-        # accept webhook but do nothing
-        return {"success": True}
-
-    # ✅ Idempotency check (per tenant)
+    # Fast dedup for redeliveries; apply_webhook_update re-checks per tenant
+    event_id = webhook_event_id(payload_json)
     if event_id:
-        existing = db.scalar(
-            select(PaymentEvent).where(
-                PaymentEvent.tenant_id == pay.tenant_id,
-                PaymentEvent.provider_event_id == event_id,
-            )
+        seen = db.scalar(
+            select(PaymentEvent.id).where(PaymentEvent.provider_event_id == event_id).limit(1)
         )
-        if existing:
+        if seen:
             return {"success": True}
 
-    # Store webhook event
-    db.add(
-        PaymentEvent(
-            tenant_id=pay.tenant_id,
-            provider=PaymentProvider.RAZORPAY,
-            event_type=event_type or "unknown",
-            provider_event_id=event_id,
-            provider_order_id=provider_order_id or None,
-            provider_payment_id=provider_payment_id or None,
-            payload=payload_json,
-        )
-    )
-
-    # Update Payment status
-    if status == "authorized":
-        pay.status = PaymentStatus.AUTHORIZED
-    elif status == "captured":
-        pay.status = PaymentStatus.CAPTURED
-    elif status == "failed":
-        pay.status = PaymentStatus.FAILED
-    elif status == "refunded":
-        pay.status = PaymentStatus.REFUNDED
-
-    if provider_payment_id:
-        pay.provider_payment_id = provider_payment_id
+    from app.workers.tasks import apply_razorpay_webhook  # celery task
 
-    # Update Appointment payment_status
-    appt = db.scalar(
-        select(Appointment).where(
-            Appointment.tenant_id == pay.tenant_id,
-            Appointment.id == pay.appointment_id,
-        )
-    )
-    if appt:
-        if pay.status == PaymentStatus.CAPTURED:
-            appt.payment_status = ApptPayStatus.PAID
-        elif pay.status == PaymentStatus.FAILED:
-            appt.payment_status = ApptPayStatus.FAILED
-        elif pay.status == PaymentStatus.REFUNDED:
-            appt.payment_status = ApptPayStatus.REFUNDED
-
-    db.commit()
+    # if enqueueing fails we return 500 and Razorpay redelivers
+    apply_razorpay_webhook.delay(payload_json)
     return {"success": True}
 
 
@@ -269,10 +174,10 @@ async def razorpay_webhook(request: Request, db: Session = Depends(get_db)):
 def razorpay_verify(
     body: RazorpayVerifyIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     # ✅ tenant + branch filter
     pay = db.scalar(
@@ -301,85 +206,49 @@ def razorpay_verify(
     if not ok:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    # Fetch payment from Razorpay
-    rp_payment = client.payment.fetch(body.razorpay_payment_id)
-    rp_status = rp_payment.get("status", "")
-    rp_amount_paisa = int(rp_payment.get("amount", 0))
-    rp_currency = rp_payment.get("currency", "")
-
-    expected_paisa = int(Decimal(str(pay.amount)) * 100)
-    if rp_currency != pay.currency:
-        raise HTTPException(status_code=400, detail="Currency mismatch")
-    if rp_amount_paisa != expected_paisa:
-        raise HTTPException(status_code=400, detail="Amount mismatch")
-
-    pay.provider_payment_id = body.razorpay_payment_id
-    if rp_status == "captured":
-        pay.status = PaymentStatus.CAPTURED
-    elif rp_status == "authorized":
-        pay.status = PaymentStatus.AUTHORIZED
-    elif rp_status == "failed":
-        pay.status = PaymentStatus.FAILED
-    else:
-        pay.status = PaymentStatus.FAILED
-
-    # Update appointment status (tenant + branch)
-    appt = db.scalar(
-        select(Appointment).where(
-            Appointment.tenant_id == tenant_id,
-            Appointment.branch_id == branch_id,
-            Appointment.id == pay.appointment_id,
+    # Signature proves the checkout happened; amount/currency/final status are
+    # confirmed against Razorpay by the reconcile task, off the request path.
+    # Status guard: never downgrade a payment a webhook/reconcile already settled
+    # (CAPTURED between our SELECT and here, or a replayed verify on FAILED/REFUNDED).
+    result = db.execute(
+        update(Payment)
+        .where(
+            Payment.id == pay.id,
+            Payment.status.in_((PaymentStatus.CREATED, PaymentStatus.AUTHORIZED)),
         )
+        .values(provider_payment_id=body.razorpay_payment_id, status=PaymentStatus.AUTHORIZED)
     )
-    if appt and pay.status == PaymentStatus.CAPTURED:
-        appt.payment_status = ApptPayStatus.PAID
-
-    # Log event (use payment id as provider_event_id for uniqueness)
-    db.add(
-        PaymentEvent(
+    if result.rowcount == 0:
+        db.rollback()
+        status = db.scalar(select(Payment.status).where(Payment.id == pay.id))
+        return {"success": True, "payment_status": status}
+
+    # Log event
+    db.execute(
+        insert(PaymentEvent).values(
             tenant_id=tenant_id,
             provider=PaymentProvider.RAZORPAY,
             event_type="checkout.verified",
-            provider_event_id=body.razorpay_payment_id,
+            # own namespace: the payment.* webhooks use the bare payment id as their event id
+            provider_event_id=f"checkout:{body.razorpay_payment_id}",
             provider_order_id=body.razorpay_order_id,
             provider_payment_id=body.razorpay_payment_id,
-            payload={"razorpay_payment": rp_payment},
+            payload={
+                "razorpay_order_id": body.razorpay_order_id,
+                "razorpay_payment_id": body.razorpay_payment_id,
+            },
         )
     )
 
-    # Receipt + email async (idempotent)
-    if pay.status == PaymentStatus.CAPTURED and getattr(pay, "receipt_sent_at", None) is None:
-        customer = None
-        if appt:
-            customer = db.scalar(
-                select(Customer).where(
-                    Customer.tenant_id == tenant_id,
-                    Customer.id == appt.customer_id,
-                )
-            )
-
-        from app.services.receipt_service import generate_receipt_pdf
-        from app.workers.tasks import send_email  # celery task
-
-        pdf_bytes = generate_receipt_pdf(
-            receipt_no=str(pay.id),
-            customer_name=customer.full_name if customer else "Customer",
-            amount=float(pay.amount),
-            currency=pay.currency,
-        )
+    pay_id = str(pay.id)
+    db.commit()
 
-        send_email.delay(
-            to_email=(customer.email if customer and customer.email else "fallback@email.com"),
-            subject="Payment Receipt",
-            body="Your payment was successful. Receipt attached.",
-            attachment_bytes=pdf_bytes,
-            attachment_name=f"receipt_{pay.id}.pdf",
-        )
+    # Enqueue only after commit so the worker sees provider_payment_id
+    from app.workers.tasks import reconcile_razorpay_payment  # celery task
 
-        pay.receipt_sent_at = datetime.utcnow()
+    reconcile_razorpay_payment.delay(pay_id)
 
-    db.commit()
-    return {"success": True, "payment_status": pay.status}
+    return {"success": True, "payment_status": PaymentStatus.AUTHORIZED}
 
 
 @router.post(
@@ -390,10 +259,10 @@ def razorpay_verify(
 def razorpay_refund(
     body: RefundIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     # ✅ tenant + branch filter
     pay = db.scalar(
@@ -419,10 +288,13 @@ def razorpay_refund(
         raise HTTPException(status_code=400, detail="Payment already refunded")
 
     refund_payload = {}
-    if body.amount is not None:
-        if body.amount <= 0:
+    if body.amount_paisa is not None:
+        if body.amount_paisa <= 0:
             raise HTTPException(status_code=400, detail="Refund amount must be > 0")
-        refund_payload["amount"] = int(round(float(body.amount) * 100))
+        if body.amount_paisa > pay.amount_paisa:
+            raise HTTPException(status_code=400, detail="Refund amount exceeds payment amount")
+        # integer paisa end to end, same as the stored amount: no float rounding
+        refund_payload["amount"] = body.amount_paisa
 
     refund = client.payment.refund(pay.provider_payment_id, refund_payload)
 
@@ -466,10 +338,10 @@ def razorpay_refund(
 @router.get("/")
 def list_payments(
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
     branch_id: uuid.UUID = Depends(get_branch_id),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     q = (
         select(Payment)
         .where(Payment.tenant_id == tenant_id, Payment.branch_id == branch_id)
@@ -1,10 +1,9 @@
-import uuid
 from datetime import datetime
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func
 
-from app.core.deps import get_db, get_token_payload
+from app.core.deps import get_db, TokenCtx, get_token_ctx
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.appointment_service import AppointmentService
 
@@ -16,9 +15,9 @@ def revenue_report(
     from_date: str = Query(...),
     to_date: str = Query(...),
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     start = datetime.fromisoformat(from_date)
     end = datetime.fromisoformat(to_date)
@@ -48,9 +47,9 @@ def revenue_report(
 @router.get("/services/top")
 def top_services(
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     stmt = (
         select(
@@ -79,9 +78,9 @@ def top_services(
 @router.get("/staff/performance")
 def staff_performance(
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     stmt = (
         select(
@@ -109,9 +108,9 @@ def staff_performance(
 @router.get("/cancellation-rate")
 def cancellation_rate(
     db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     total = db.scalar(
         select(func.count(Appointment.id))
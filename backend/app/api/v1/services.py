@@ -1,9 +1,8 @@
-import uuid
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
-from app.core.deps import get_db, get_token_payload, require_roles
+from app.core.deps import get_db, TokenCtx, get_token_ctx, require_roles
 from app.models.service import Service
 from app.schemas.service import ServiceCreateIn
 from app.models.user import UserRole
@@ -11,8 +10,8 @@ from app.models.user import UserRole
 router = APIRouter(prefix="/services")
 
 @router.get("")
-def list_services(db: Session = Depends(get_db), payload: dict = Depends(get_token_payload)):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+def list_services(db: Session = Depends(get_db), ctx: TokenCtx = Depends(get_token_ctx)):
+    tenant_id = ctx.tenant_id
     rows = db.scalars(select(Service).where(Service.tenant_id == tenant_id, Service.is_active == True)).all()
     return {"success": True, "data": {"items": [
         {"id": str(s.id), "name": s.name, "category": s.category, "duration_min": s.duration_min,
@@ -23,9 +22,9 @@ def list_services(db: Session = Depends(get_db), payload: dict = Depends(get_tok
 def create_service(
     body: ServiceCreateIn,
     db: Session = Depends(get_db),
-    payload: dict = Depends(require_roles(UserRole.OWNER, UserRole.MANAGER)),
+    ctx: TokenCtx = Depends(require_roles(UserRole.OWNER, UserRole.MANAGER)),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
     s = Service(
         tenant_id=tenant_id,
         name=body.name,
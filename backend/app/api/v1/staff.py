@@ -1,9 +1,9 @@
-import uuid
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_db, get_token_payload, require_roles
+from app.core.deps import get_async_db, TokenCtx, get_token_ctx, require_roles
 from app.models.staff import Staff
 from app.schemas.staff import StaffCreateIn
 from app.models.user import UserRole
@@ -11,17 +11,24 @@ from app.models.user import UserRole
 router = APIRouter(prefix="/staff")
 
 
-@router.get("")
-def list_staff(db: Session = Depends(get_db), payload: dict = Depends(get_token_payload)):
-    tenant_id = uuid.UUID(payload["tenant_id"])
-    rows = db.scalars(select(Staff).where(Staff.tenant_id == tenant_id, Staff.is_active == True)).all()
+@router.get("", response_class=ORJSONResponse)
+async def list_staff(db: AsyncSession = Depends(get_async_db), ctx: TokenCtx = Depends(get_token_ctx)):
+    tenant_id = ctx.tenant_id
+    # ✅ Only the emitted columns: plain Rows, no Staff instances / identity map
+    rows = (
+        await db.execute(
+            select(Staff.id, Staff.full_name, Staff.role, Staff.work_start_time, Staff.work_end_time)
+            .where(Staff.tenant_id == tenant_id, Staff.is_active == True)
+        )
+    ).all()
 
-    return {
+    # returned as a Response so FastAPI skips jsonable_encoder; orjson does all the encoding
+    return ORJSONResponse({
         "success": True,
         "data": {
             "items": [
                 {
-                    "id": str(s.id),
+                    "id": s.id,  # orjson writes UUIDs as strings
                     "full_name": s.full_name,
                     "role": s.role,
                     "work_start_time": s.work_start_time,
@@ -30,16 +37,16 @@ def list_staff(db: Session = Depends(get_db), payload: dict = Depends(get_token_
                 for s in rows
             ]
         }
-    }
+    })
 
 
 @router.post("")
-def create_staff(
+async def create_staff(
     body: StaffCreateIn,
-    db: Session = Depends(get_db),
-    payload: dict = Depends(require_roles(UserRole.OWNER, UserRole.MANAGER)),
+    db: AsyncSession = Depends(get_async_db),
+    ctx: TokenCtx = Depends(require_roles(UserRole.OWNER, UserRole.MANAGER)),
 ):
-    tenant_id = uuid.UUID(payload["tenant_id"])
+    tenant_id = ctx.tenant_id
 
     staff = Staff(
         tenant_id=tenant_id,
@@ -50,7 +57,6 @@ def create_staff(
     )
 
     db.add(staff)
-    db.commit()
-    db.refresh(staff)
+    await db.commit()  # expire_on_commit=False: staff.id stays loaded, no refresh round trip
 
     return {"success": True, "data": {"id": str(staff.id)}}
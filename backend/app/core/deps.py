@@ -1,11 +1,12 @@
 import uuid
-from typing import Generator
-from fastapi import Depends, HTTPException, Header
+from dataclasses import dataclass
+from typing import AsyncGenerator, Generator
+from fastapi import Depends, HTTPException, Header, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select
 
-from app.db.session import SessionLocal
-from app.core.security import decode_token
+from app.db.queries import safe_select
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.models.branch import Branch
 from app.models.user import UserRole
 
@@ -18,37 +19,61 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
-def get_token_payload(authorization: str = Header(...)) -> dict:
-    if not authorization.lower().startswith("bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization header")
-    token = authorization.split(" ", 1)[1].strip()
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_token_payload(request: Request) -> dict:
+    """Payload decoded once by RequestContextMiddleware (see request.state.jwt_payload)."""
+    payload = getattr(request.state, "jwt_payload", None)
+    if payload is None:
+        detail = getattr(request.state, "jwt_error", None) or "Invalid authorization header"
+        raise HTTPException(status_code=401, detail=detail)
+    return payload
+
+
+@dataclass(frozen=True)
+class TokenCtx:
+    tenant_id: uuid.UUID
+    user_id: uuid.UUID
+    role: str
+
+
+def get_token_ctx(payload: dict = Depends(get_token_payload)) -> TokenCtx:
+    """Token claims with the ids parsed once, so endpoints never touch the raw payload."""
     try:
-        return decode_token(token)
-    except ValueError as e:
-        raise HTTPException(status_code=401, detail=str(e))
+        return TokenCtx(
+            tenant_id=uuid.UUID(payload["tenant_id"]),
+            user_id=uuid.UUID(payload["sub"]),
+            role=payload.get("role", ""),
+        )
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token claims")
 
 
 def require_roles(*roles: str):
-    def _checker(payload: dict = Depends(get_token_payload)):
-        role = payload.get("role")
-        if role not in roles:
+    def _checker(ctx: TokenCtx = Depends(get_token_ctx)) -> TokenCtx:
+        if ctx.role not in roles:
             raise HTTPException(status_code=403, detail="Not enough permissions")
-        return True
+        return ctx
     return _checker
 
 
-def get_branch_id(
+async def get_branch_id(
     x_branch_id: str = Header(..., alias="X-Branch-Id"),
-    db: Session = Depends(get_db),
-    payload: dict = Depends(get_token_payload),
+    ctx: TokenCtx = Depends(get_token_ctx),
 ) -> uuid.UUID:
-    tenant_id = uuid.UUID(payload["tenant_id"])
     try:
         branch_id = uuid.UUID(x_branch_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid X-Branch-Id")
 
-    branch = db.scalar(select(Branch).where(Branch.id == branch_id, Branch.tenant_id == tenant_id))
+    # Own short-lived session: most callers are sync endpoints with their own get_db session,
+    # so don't keep this connection checked out (idle in transaction) for the whole request.
+    async with AsyncSessionLocal() as db:
+        branch = await db.scalar(safe_select(Branch).where(Branch.id == branch_id, Branch.tenant_id == ctx.tenant_id))
+        await db.rollback()
     if not branch:
         raise HTTPException(status_code=403, detail="Branch not found for tenant")
 
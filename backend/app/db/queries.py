@@ -0,0 +1,10 @@
+from sqlalchemy import Select, select
+from sqlalchemy.orm import raiseload
+
+
+def safe_select(model) -> Select:
+    """
+    select(model) with every relationship set to raise on lazy load.
+    Accidental N+1s fail loudly; load what you need with selectinload/joinedload.
+    """
+    return select(model).options(raiseload("*"))
@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 from app.core.config import settings
 
 connect_args = {}
@@ -9,3 +10,23 @@ if settings.DATABASE_URL.startswith("sqlite"):
 
 engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, connect_args=connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _async_database_url(url: str) -> URL:
+    u = make_url(url)
+    if u.drivername.startswith("postgresql"):
+        # psycopg 3 (already a dependency) ships its own asyncio driver
+        return u.set(drivername="postgresql+psycopg")
+    if u.drivername.startswith("sqlite"):
+        return u.set(drivername="sqlite+aiosqlite")
+    return u
+
+
+# ✅ Async engine for `async def` endpoints (same database, separate pool)
+_async_url = _async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url,
+    pool_pre_ping=True,
+    **({"pool_size": 20, "max_overflow": 10} if _async_url.drivername.startswith("postgresql") else {}),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -1,15 +1,15 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 
-def send_email_smtp(*, host: str, port: int, username: str, password: str,
-                   to_email: str, subject: str, body: str,
-                   attachment_bytes: bytes | None = None,
-                   attachment_name: str = "attachment.pdf"):
+from app.integration.smtp_pool import smtp_pool
+
+def build_email_message(*, from_email: str, to_email: str, subject: str, body: str,
+                        attachment_bytes: bytes | None = None,
+                        attachment_name: str = "attachment.pdf") -> MIMEMultipart:
     msg = MIMEMultipart()
     msg["Subject"] = subject
-    msg["From"] = username
+    msg["From"] = from_email
     msg["To"] = to_email
 
     msg.attach(MIMEText(body, "plain", "utf-8"))
@@ -18,9 +18,23 @@ def send_email_smtp(*, host: str, port: int, username: str, password: str,
         part = MIMEApplication(attachment_bytes, Name=attachment_name)
         part["Content-Disposition"] = f'attachment; filename="{attachment_name}"'
         msg.attach(part)
+    return msg
+
+
+def send_email_smtp(*, host: str, port: int, username: str, password: str,
+                   to_email: str, subject: str, body: str,
+                   attachment_bytes: bytes | None = None,
+                   attachment_name: str = "attachment.pdf"):
+    msg = build_email_message(
+        from_email=username,
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        attachment_bytes=attachment_bytes,
+        attachment_name=attachment_name,
+    )
 
-    server = smtplib.SMTP(host, port)
-    server.starttls()
-    server.login(username, password)
-    server.sendmail(username, [to_email], msg.as_string())
-    server.quit()
+    # ✅ Reuse a pooled, already-authenticated session
+    with smtp_pool.connection(host, port, username, password) as conn:
+        conn.server.sendmail(username, [to_email], msg.as_string())
+        conn.sent += 1
@@ -1,9 +1,35 @@
 import hmac, hashlib, json
+from functools import lru_cache
 from typing import Any
 
+try:
+    # OpenSSL's HMAC object directly: copy/update/digest never enter the pure-Python hmac.HMAC wrapper
+    from _hashlib import hmac_new as _openssl_hmac_new
+except ImportError:  # non-OpenSSL builds / other interpreters
+    _openssl_hmac_new = None
+
+@lru_cache(maxsize=8)
+def _hmac_proto(secret: str):
+    # Key already padded and absorbed; .copy() skips that per call
+    if _openssl_hmac_new is not None:
+        return _openssl_hmac_new(secret.encode(), b"", "sha256")
+    return hmac.new(secret.encode(), b"", hashlib.sha256)
+
+def _hmac_sha256(secret: str, msg: bytes) -> bytes:
+    h = _hmac_proto(secret).copy()
+    h.update(msg)
+    return h.digest()
+
+def _signature_matches(expected: bytes, signature: str) -> bool:
+    # compare raw 32-byte digests rather than 64-char hex strings
+    try:
+        sig_bytes = bytes.fromhex(signature)
+    except ValueError:
+        return False
+    return hmac.compare_digest(expected, sig_bytes)
+
 def verify_razorpay_webhook_signature(raw_body: bytes, signature: str, webhook_secret: str) -> bool:
-    digest = hmac.new(webhook_secret.encode(), raw_body, hashlib.sha256).hexdigest()
-    return hmac.compare_digest(digest, signature)
+    return _signature_matches(_hmac_sha256(webhook_secret, raw_body), signature)
 
 def rupees_to_paisa(amount_rupees: float) -> int:
     # Razorpay expects integer paisa
@@ -11,5 +37,4 @@ def rupees_to_paisa(amount_rupees: float) -> int:
 
 def verify_razorpay_checkout_signature(order_id: str, payment_id: str, signature: str, key_secret: str) -> bool:
     msg = f"{order_id}|{payment_id}".encode()
-    expected = hmac.new(key_secret.encode(), msg, hashlib.sha256).hexdigest()
-    return hmac.compare_digest(expected, signature)
+    return _signature_matches(_hmac_sha256(key_secret, msg), signature)
@@ -0,0 +1,122 @@
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Tuple
+
+# Rotate a connection after this many messages; providers throttle/drop long-lived sessions
+MAX_MESSAGES_PER_CONNECTION = 5000
+# Idle connections kept per (host, port, username)
+MAX_IDLE_PER_KEY = 4
+# Socket timeout for connect and every command; a pooled session silently dropped by
+# a NAT/firewall must fail the NOOP check quickly, not after the OS TCP timeout
+SMTP_TIMEOUT_SEC = 30
+
+# Failures after which the session is still usable (server answered, smtplib sent RSET)
+_RECOVERABLE = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+PoolKey = Tuple[str, int, str]
+
+
+@dataclass
+class PooledSMTP:
+    server: smtplib.SMTP
+    sent: int = 0
+
+
+def _close(conn: PooledSMTP) -> None:
+    try:
+        conn.server.quit()
+    except Exception:
+        try:
+            conn.server.close()
+        except Exception:
+            pass
+
+
+def _is_alive(conn: PooledSMTP) -> bool:
+    try:
+        code, _ = conn.server.noop()
+        return code == 250
+    except Exception:
+        return False
+
+
+class SMTPPool:
+    """
+    Process-wide pool of logged-in SMTP sessions keyed by (host, port, username).
+    Saves the TCP + STARTTLS + AUTH handshake on every message after the first.
+    """
+
+    def __init__(self, max_idle_per_key: int = MAX_IDLE_PER_KEY,
+                 max_messages: int = MAX_MESSAGES_PER_CONNECTION):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_messages = max_messages
+        self._queues: Dict[PoolKey, "queue.Queue[PooledSMTP]"] = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, key: PoolKey) -> "queue.Queue[PooledSMTP]":
+        with self._lock:
+            q = self._queues.get(key)
+            if q is None:
+                q = self._queues[key] = queue.Queue(maxsize=self.max_idle_per_key)
+            return q
+
+    @staticmethod
+    def _connect(host: str, port: int, username: str, password: str) -> PooledSMTP:
+        server = smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT_SEC)
+        server.ehlo_or_helo_if_needed()
+        server.starttls()
+        server.ehlo()
+        server.login(username, password)
+        return PooledSMTP(server=server)
+
+    def acquire(self, host: str, port: int, username: str, password: str) -> PooledSMTP:
+        q = self._queue((host, port, username))
+        while True:
+            try:
+                conn = q.get_nowait()
+            except queue.Empty:
+                return self._connect(host, port, username, password)
+            if _is_alive(conn):
+                return conn
+            _close(conn)
+
+    def release(self, host: str, port: int, username: str, conn: PooledSMTP, broken: bool = False) -> None:
+        if broken or conn.sent >= self.max_messages:
+            _close(conn)
+            return
+        try:
+            self._queue((host, port, username)).put_nowait(conn)
+        except queue.Full:
+            _close(conn)
+
+    @contextmanager
+    def connection(self, host: str, port: int, username: str, password: str) -> Iterator[PooledSMTP]:
+        conn = self.acquire(host, port, username, password)
+        broken = False
+        try:
+            yield conn
+        except _RECOVERABLE:
+            raise
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            self.release(host, port, username, conn, broken=broken)
+
+    def drain(self) -> None:
+        """Close every idle connection (worker shutdown)."""
+        with self._lock:
+            queues = list(self._queues.values())
+            self._queues.clear()
+        for q in queues:
+            while True:
+                try:
+                    _close(q.get_nowait())
+                except queue.Empty:
+                    break
+
+
+smtp_pool = SMTPPool()
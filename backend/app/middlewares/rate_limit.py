@@ -1,13 +1,37 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import time
-from collections import defaultdict, deque
 from dataclasses import dataclass
-from typing import Deque, Dict, Tuple
 
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import Response
+
+from app.core.config import settings
+
+# Sliding window on a sorted set (score = request time in ms), atomic per key:
+# drop entries older than the window, count, and record this request if under the limit.
+# Returns the count *before* this request; >= max_requests means rejected.
+SLIDING_WINDOW_LUA = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1])
+local c = redis.call('ZCARD', KEYS[1])
+if c >= tonumber(ARGV[3]) then return c end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[5])
+redis.call('PEXPIRE', KEYS[1], ARGV[4])
+return c
+"""
+
+# Coalescing: the first queued check arms a FLUSH_INTERVAL_SEC timer and everything
+# queued by then goes out as one pipeline; FLUSH_THRESHOLD waiting checks flush at once.
+FLUSH_INTERVAL_SEC = 0.001
+FLUSH_THRESHOLD = 64
+# Redis must answer fast or we fail open; a hung Redis can't stall requests
+REDIS_TIMEOUT_SEC = 0.2
 
 @dataclass
 class RateLimitRule:
@@ -16,36 +40,104 @@ class RateLimitRule:
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
-    Simple in-memory rate limiter.
-    ✅ Good for single-instance deployment
-    ⚠️ For multi-instance production: move to Redis (same algorithm, shared store).
+    Redis-backed sliding-window rate limiter.
+    ✅ Shared across workers/instances, atomic per key (one Lua call)
+    ✅ Keys expire with the window, so memory stays bounded
+    ✅ Concurrent checks are queued and sent as one pipeline (within ~1ms of the
+       first queued check, or sooner once FLUSH_THRESHOLD checks are waiting)
+    If Redis is unreachable the request is let through (fail open).
     """
-    def __init__(self, app, rule: RateLimitRule, key_prefix: str = "rl"):
+    def __init__(self, app, rule: RateLimitRule, redis: aioredis.Redis | None = None, key_prefix: str = "rl"):
         super().__init__(app)
         self.rule = rule
         self.key_prefix = key_prefix
-        self.buckets: Dict[str, Deque[float]] = defaultdict(deque)
+        self.redis = redis if redis is not None else aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=REDIS_TIMEOUT_SEC,
+            socket_timeout=REDIS_TIMEOUT_SEC,
+        )
+        self.window_ms = rule.window_sec * 1000
+        self._sha: str | None = None
+        self._pending: dict[str, list[asyncio.Future]] = {}
+        self._queued = 0
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()  # strong refs until done
+        # 429 is identical every time: encode it once
+        self._reject_body = orjson.dumps({"detail": "Too many requests. Try again later."})
+        self._reject_headers = {"Retry-After": str(rule.window_sec)}
 
     def _key(self, request: Request) -> str:
         ip = request.client.host if request.client else "unknown"
         path = request.url.path
         return f"{self.key_prefix}:{ip}:{path}"
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        key = self._key(request)
-        now = time.time()
-        window_start = now - self.rule.window_sec
+    async def _load_script(self) -> str:
+        self._sha = await self.redis.script_load(SLIDING_WINDOW_LUA)
+        return self._sha
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]) -> list:
+        sha = self._sha or await self._load_script()
+        now_ms = int(time.time() * 1000)
+        window_start = now_ms - self.window_ms
+
+        pipe = self.redis.pipeline(transaction=False)
+        for key, _ in batch:
+            # members must be unique, or two hits in the same ms would count once
+            member = f"{now_ms}-{os.urandom(4).hex()}"
+            pipe.evalsha(sha, 1, key, window_start, now_ms, self.rule.max_requests, self.window_ms, member)
+        return await pipe.execute(raise_on_error=False)
 
-        q = self.buckets[key]
-        while q and q[0] < window_start:
-            q.popleft()
+    async def _flush(self) -> None:
+        pending, self._pending, self._queued = self._pending, {}, 0
+        batch = [(key, fut) for key, futs in pending.items() for fut in futs]
+        if not batch:
+            return
 
-        if len(q) >= self.rule.max_requests:
-            return JSONResponse(
+        try:
+            # overall bound too: covers injected clients without socket timeouts
+            results = await asyncio.wait_for(self._run_batch(batch), REDIS_TIMEOUT_SEC)
+            if any(isinstance(r, NoScriptError) for r in results):
+                # script cache flushed / Redis restarted; NOSCRIPT entries didn't run
+                await asyncio.wait_for(self._load_script(), REDIS_TIMEOUT_SEC)
+                results = await asyncio.wait_for(self._run_batch(batch), REDIS_TIMEOUT_SEC)
+        except Exception:
+            results = [None] * len(batch)
+
+        for (_, fut), count in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(count, Exception) or count is None:
+                fut.set_result(True)  # fail open
+            else:
+                fut.set_result(int(count) < self.rule.max_requests)
+
+    def _flush_soon(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        task = asyncio.get_running_loop().create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _allow(self, key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.setdefault(key, []).append(fut)
+        self._queued += 1
+        if self._queued >= FLUSH_THRESHOLD:
+            self._flush_soon()
+        elif self._flush_timer is None:
+            # no idle wakeups: a timer exists only while checks are queued
+            self._flush_timer = loop.call_later(FLUSH_INTERVAL_SEC, self._flush_soon)
+        return await fut
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        if not await self._allow(self._key(request)):
+            return Response(
+                content=self._reject_body,
                 status_code=429,
-                content={"detail": "Too many requests. Try again later."},
-                headers={"Retry-After": str(self.rule.window_sec)},
+                headers=self._reject_headers,
+                media_type="application/json",
             )
 
-        q.append(now)
         return await call_next(request)
@@ -1,29 +1,74 @@
-import uuid as uuidlib
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+import os
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.security import decode_token
 
-class RequestContextMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        request_id = str(uuidlib.uuid4())
+_BEARER_PREFIXES = frozenset({b"Bearer ", b"bearer ", b"BEARER "})
+# Razorpay webhooks carry their own HMAC signature, not a bearer token
+NO_AUTH_PREFIXES = ("/health", "/docs", "/redoc", "/openapi.json", "/api/v1/payments/razorpay/webhook")
+
+def _new_request_id() -> str:
+    """RFC 4122 v4-shaped id straight from os.urandom, without building a uuid.UUID."""
+    b = bytearray(os.urandom(16))
+    b[6] = (b[6] & 0x0F) | 0x40  # version 4
+    b[8] = (b[8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI: fills request.state (via scope["state"]) and adds X-Request-ID to
+    http.response.start, without BaseHTTPMiddleware's extra task/stream per request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _new_request_id()
         tenant_id = None
         user_id = None
+        payload = None
+        jwt_error = None
+
+        auth = None
+        # public / self-authenticating routes never need the JWT decoded
+        if not scope["path"].startswith(NO_AUTH_PREFIXES):
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    auth = value
+                    break
 
-        auth = request.headers.get("authorization", "")
-        if auth.lower().startswith("bearer "):
-            token = auth.split(" ", 1)[1].strip()
+        # prefix check on the raw header bytes; no lower()/split()/str decode of the prefix
+        if auth and len(auth) > 7 and auth[:7] in _BEARER_PREFIXES:
+            token = auth[7:].strip().decode("latin-1")
             try:
                 payload = decode_token(token)
                 tenant_id = payload.get("tenant_id")
                 user_id = payload.get("sub")
+            except ValueError as e:
+                jwt_error = str(e)
             except Exception:
                 pass
 
-        request.state.request_id = request_id
-        request.state.tenant_id = tenant_id
-        request.state.user_id = user_id
+        state = scope.setdefault("state", {})
+        state["request_id"] = request_id
+        state["tenant_id"] = tenant_id
+        state["user_id"] = user_id
+        # ✅ get_token_payload reads these instead of decoding the token again
+        state["jwt_payload"] = payload
+        state["jwt_error"] = jwt_error
+
+        raw_request_id = request_id.encode("latin-1")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = [h for h in message.get("headers") or [] if h[0] != b"x-request-id"]
+                headers.append((b"x-request-id", raw_request_id))
+                message["headers"] = headers
+            await send(message)
 
-        resp = await call_next(request)
-        resp.headers["X-Request-ID"] = request_id
-        return resp
+        await self.app(scope, receive, send_wrapper)
@@ -1,19 +1,35 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        resp = await call_next(request)
+# Basic hardening, pre-encoded once as raw ASGI header pairs
+_STATIC_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"referrer-policy", b"no-referrer"),
+    (b"permissions-policy", b"geolocation=(), microphone=(), camera=()"),
+    # HSTS only if behind HTTPS (reverse proxy should terminate TLS)
+    # Enable when deployed with HTTPS:
+    # (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+)
+_STATIC_NAMES = frozenset(name for name, _ in _STATIC_HEADERS)
 
-        # Basic hardening
-        resp.headers["X-Content-Type-Options"] = "nosniff"
-        resp.headers["X-Frame-Options"] = "DENY"
-        resp.headers["Referrer-Policy"] = "no-referrer"
-        resp.headers["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
+class SecurityHeadersMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware task/stream per request): adds the headers to http.response.start."""
 
-        # HSTS only if behind HTTPS (reverse proxy should terminate TLS)
-        # Enable when deployed with HTTPS:
-        # resp.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        return resp
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = message.get("headers") or []
+                # same override semantics as headers[...] = ...
+                if any(name in _STATIC_NAMES for name, _ in headers):
+                    headers = [h for h in headers if h[0] not in _STATIC_NAMES]
+                message["headers"] = [*headers, *_STATIC_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
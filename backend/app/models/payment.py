@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Numeric, Index, ForeignKey
+from sqlalchemy import BigInteger, String, DateTime, Index, ForeignKey, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
@@ -23,6 +23,13 @@ class Payment(Base):
 
     __table_args__ = (
         Index("ix_payments_tenant_appt", "tenant_id", "appointment_id","branch_id"),
+        Index(
+            "ix_payments_provider_order_id",
+            "provider_order_id",
+            postgresql_include=["tenant_id", "appointment_id", "status"],
+        ),
+        # "recent payments" listing: WHERE tenant_id = ... ORDER BY created_at DESC
+        Index("ix_payments_tenant_created_at", "tenant_id", text("created_at DESC")),
     )
 
 
@@ -63,7 +70,8 @@ class Payment(Base):
     provider_order_id: Mapped[str] = mapped_column(String(255))
     provider_payment_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
 
-    amount: Mapped[float] = mapped_column(Numeric(10, 2))
+    # integer paisa (what Razorpay sends/expects); `amount` gives rupees
+    amount_paisa: Mapped[int] = mapped_column(BigInteger, nullable=False)
     currency: Mapped[str] = mapped_column(String(10), default="INR")
 
     status: Mapped[str] = mapped_column(
@@ -72,10 +80,15 @@ class Payment(Base):
     )
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime,
-        default=datetime.utcnow
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
     )
 
-receipt_sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
-refund_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
-refund_status: Mapped[str | None] = mapped_column(String(50), nullable=True)
\ No newline at end of file
+    receipt_sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    refund_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    refund_status: Mapped[str | None] = mapped_column(String(50), nullable=True)
+
+    @property
+    def amount(self) -> float:
+        return self.amount_paisa / 100.0
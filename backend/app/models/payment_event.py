@@ -24,5 +24,7 @@ class PaymentEvent(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
 
-Index("ix_payment_events_tenant_event", PaymentEvent.tenant_id, PaymentEvent.provider_event_id)
+# unique: webhook inserts rely on ON CONFLICT DO NOTHING for idempotency (NULL event ids never conflict)
+Index("uq_payment_events_tenant_event", PaymentEvent.tenant_id, PaymentEvent.provider_event_id, unique=True)
 Index("ix_payment_events_tenant_order", PaymentEvent.tenant_id, PaymentEvent.provider_order_id)
+Index("ix_payment_events_provider_event_id", PaymentEvent.provider_event_id)
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import String, Time, DateTime, func, Boolean
+from sqlalchemy import String, Time, DateTime, func, Boolean, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
@@ -7,6 +7,17 @@ from app.db.base import Base
 class Staff(Base):
     __tablename__ = "staff"
 
+    __table_args__ = (
+        # list_staff: active staff per tenant; INCLUDE lets it run as an index-only scan
+        Index(
+            "ix_staff_tenant_active",
+            "tenant_id",
+            "is_active",
+            postgresql_where=text("is_active = true"),
+            postgresql_include=["id", "full_name", "role", "work_start_time", "work_end_time"],
+        ),
+    )
+
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), index=True, nullable=False)
 
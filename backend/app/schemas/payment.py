@@ -15,7 +15,7 @@ class CustomerInfoOut(BaseModel):
 # ---------- Razorpay: Create Order ----------
 class CreateRazorpayOrderIn(BaseModel):
     appointment_id: UUID
-    amount: float = Field(..., gt=0)
+    amount_paisa: int = Field(..., gt=0)
     currency: str = "INR"
 
 
@@ -23,6 +23,7 @@ class CreateRazorpayOrderDataOut(BaseModel):
     payment_id: str
     provider: str
     provider_order_id: str
+    amount_paisa: int
     amount: float
     currency: str
     razorpay_key_id: str
@@ -50,7 +51,7 @@ class RazorpayVerifyOut(BaseModel):
 # ---------- Refund ----------
 class RefundIn(BaseModel):
     payment_id: UUID
-    amount: Optional[float] = Field(default=None, gt=0)
+    amount_paisa: Optional[int] = Field(default=None, gt=0)  # None = full refund
 
 
 class RefundOut(BaseModel):
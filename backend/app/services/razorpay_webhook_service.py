@@ -0,0 +1,166 @@
+import uuid
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+from app.models.appointment import Appointment, ApptPayStatus
+from app.models.payment import Payment, PaymentProvider, PaymentStatus
+from app.models.payment_event import PaymentEvent
+
+
+# Statuses each webhook-driven transition may start from. Never leaves REFUNDED,
+# never moves CAPTURED back to AUTHORIZED/FAILED.
+ALLOWED_PREVIOUS_STATUS = {
+    PaymentStatus.AUTHORIZED: (PaymentStatus.CREATED,),
+    PaymentStatus.CAPTURED: (PaymentStatus.CREATED, PaymentStatus.AUTHORIZED),
+    PaymentStatus.FAILED: (PaymentStatus.CREATED, PaymentStatus.AUTHORIZED),
+    PaymentStatus.REFUNDED: (PaymentStatus.CAPTURED,),
+}
+
+
+def _entities(payload_json: dict) -> tuple[dict, dict, dict]:
+    body = payload_json.get("payload") or {}
+    payment_entity = (body.get("payment") or {}).get("entity") or {}
+    order_entity = (body.get("order") or {}).get("entity") or {}
+    refund_entity = (body.get("refund") or {}).get("entity") or {}
+    return payment_entity, order_entity, refund_entity
+
+
+def webhook_event_id(payload_json: dict) -> str | None:
+    # event_id: payment.id or order.id or refund.id
+    payment_entity, order_entity, refund_entity = _entities(payload_json)
+    return (
+        payment_entity.get("id")
+        or order_entity.get("id")
+        or refund_entity.get("id")
+        or None
+    )
+
+
+def apply_webhook_update(payload_json: dict) -> None:
+    """
+    Apply a signature-verified Razorpay webhook: store the event idempotently and
+    move the Payment/Appointment statuses. Runs after the 200 has been sent, so it
+    opens its own session.
+    """
+    db = SessionLocal()
+    try:
+        _apply_webhook_update(db, payload_json)
+    finally:
+        db.close()
+
+
+def _apply_webhook_update(db: Session, payload_json: dict) -> None:
+    event_type = payload_json.get("event", "")
+    payment_entity, order_entity, refund_entity = _entities(payload_json)
+    event_id = webhook_event_id(payload_json)
+
+    provider_order_id = (
+        payment_entity.get("order_id")
+        or order_entity.get("id")
+        or refund_entity.get("order_id")
+        or ""
+    )
+    provider_payment_id = (
+        payment_entity.get("id")
+        or refund_entity.get("payment_id")
+        or ""
+    )
+    status = (
+        payment_entity.get("status")
+        or order_entity.get("status")
+        or refund_entity.get("status")
+        or ""
+    )
+
+    notes = payment_entity.get("notes") or order_entity.get("notes") or {}
+    tenant_id_str = notes.get("tenant_id")
+
+    if not provider_order_id:
+        # accept webhook but do nothing
+        return
+
+    # ✅ One lookup by provider_order_id (covered by ix_payments_provider_order_id),
+    # preferring the tenant named in notes, with the appointment joined in.
+    stmt = (
+        select(Payment, Appointment)
+        .outerjoin(
+            Appointment,
+            and_(Appointment.id == Payment.appointment_id, Appointment.tenant_id == Payment.tenant_id),
+        )
+        .where(Payment.provider_order_id == provider_order_id)
+        .limit(1)
+    )
+    if tenant_id_str:
+        try:
+            stmt = stmt.order_by((Payment.tenant_id == uuid.UUID(tenant_id_str)).desc())
+        except Exception:
+            pass
+
+    row = db.execute(stmt).first()
+    if not row:
+        # accept webhook but do nothing
+        return
+    pay, appt = row
+
+    # Store webhook event; ✅ idempotent per tenant via uq_payment_events_tenant_event,
+    # so concurrent / retried deliveries of the same event apply once
+    inserted = db.execute(
+        insert(PaymentEvent)
+        .values(
+            tenant_id=pay.tenant_id,
+            provider=PaymentProvider.RAZORPAY,
+            event_type=event_type or "unknown",
+            provider_event_id=event_id,
+            provider_order_id=provider_order_id or None,
+            provider_payment_id=provider_payment_id or None,
+            # only the entity this event is about; the outer envelope repeats what the row already has
+            payload={"event": event_type, "entity": payment_entity or refund_entity or order_entity},
+        )
+        .on_conflict_do_nothing(index_elements=["tenant_id", "provider_event_id"])
+    )
+    if inserted.rowcount == 0:
+        db.rollback()
+        return
+
+    # Update Payment status (core UPDATEs: no ORM change tracking / flush)
+    new_status = {
+        "authorized": PaymentStatus.AUTHORIZED,
+        "captured": PaymentStatus.CAPTURED,
+        "failed": PaymentStatus.FAILED,
+        "refunded": PaymentStatus.REFUNDED,
+    }.get(status)
+
+    if provider_payment_id:
+        db.execute(
+            update(Payment)
+            .where(Payment.id == pay.id)
+            .values(provider_payment_id=provider_payment_id)
+        )
+
+    # Deliveries can arrive late / retried / out of order: only move forward
+    applied = False
+    if new_status:
+        result = db.execute(
+            update(Payment)
+            .where(Payment.id == pay.id, Payment.status.in_(ALLOWED_PREVIOUS_STATUS[new_status]))
+            .values(status=new_status)
+        )
+        applied = result.rowcount > 0
+
+    # Update Appointment payment_status
+    appt_status = {
+        PaymentStatus.CAPTURED: ApptPayStatus.PAID,
+        PaymentStatus.FAILED: ApptPayStatus.FAILED,
+        PaymentStatus.REFUNDED: ApptPayStatus.REFUNDED,
+    }.get(new_status if applied else pay.status)
+    if appt and appt_status:
+        db.execute(
+            update(Appointment)
+            .where(Appointment.id == appt.id)
+            .values(payment_status=appt_status)
+        )
+
+    db.commit()
@@ -1,7 +1,9 @@
+import hashlib
 from io import BytesIO
 from reportlab.pdfgen import canvas
 
-def generate_receipt_pdf(receipt_no: str, customer_name: str, amount: float, currency: str) -> bytes:
+def generate_receipt_pdf(receipt_no: str, customer_name: str, amount: float, currency: str) -> tuple[bytes, str]:
+    """Render the receipt; returns (pdf_bytes, sha256_hex) so callers never rehash it."""
     buffer = BytesIO()
     c = canvas.Canvas(buffer)
 
@@ -16,4 +18,5 @@ def generate_receipt_pdf(receipt_no: str, customer_name: str, amount: float, cur
     c.showPage()
     c.save()
 
-    return buffer.getvalue()
+    pdf = buffer.getvalue()
+    return pdf, hashlib.sha256(pdf).hexdigest()
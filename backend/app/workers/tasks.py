@@ -1,13 +1,30 @@
 from __future__ import annotations
 
 import hashlib
+import smtplib
+import uuid
 from datetime import datetime
 from typing import Optional
 
+from celery.signals import worker_process_shutdown
+from celery.utils.log import get_task_logger
+from sqlalchemy import select, update
+
 from app.core.config import settings
-from app.integration.email import send_email_smtp
+from app.db.session import SessionLocal
+from app.integration.email import build_email_message, send_email_smtp
+from app.integration.razorpay_client import client
+from app.integration.smtp_pool import smtp_pool
+from app.models.appointment import Appointment, ApptPayStatus
+from app.models.customer import Customer
+from app.models.payment import Payment, PaymentProvider, PaymentStatus
+from app.models.payment_event import PaymentEvent
+from app.services.razorpay_webhook_service import apply_webhook_update, webhook_event_id
+from app.services.receipt_service import generate_receipt_pdf
 from app.workers.celery_app import celery_app
 
+logger = get_task_logger(__name__)
+
 
 @celery_app.task(name="app.workers.tasks.ping_task")
 def ping_task():
@@ -15,6 +32,12 @@ def ping_task():
     return "pong"
 
 
+@worker_process_shutdown.connect
+def _drain_smtp_pool(**_kwargs):
+    # QUIT pooled SMTP sessions instead of letting the server time them out
+    smtp_pool.drain()
+
+
 def _hash_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
@@ -27,7 +50,8 @@ def _hash_bytes(b: bytes) -> str:
     retry_jitter=True,
     retry_kwargs={"max_retries": 5},
 )
-def send_email(self, to_email: str, subject: str, body: str, attachment_bytes: Optional[bytes]=None, attachment_name: str="receipt.pdf"):
+def send_email(self, to_email: str, subject: str, body: str, attachment_bytes: Optional[bytes]=None, attachment_name: str="receipt.pdf", purpose: str="generic"):
+    # purpose ("generic", "booking", ...) is only a label for logs / task results
     send_email_smtp(
         host=settings.SMTP_HOST,
         port=settings.SMTP_PORT,
@@ -39,27 +63,260 @@ def send_email(self, to_email: str, subject: str, body: str, attachment_bytes: O
         attachment_bytes=attachment_bytes,
         attachment_name=attachment_name,
     )
-    return {"ok": True, "attachment_sha256": _hash_bytes(attachment_bytes) if attachment_bytes else None}
+    return {"ok": True, "purpose": purpose, "attachment_sha256": _hash_bytes(attachment_bytes) if attachment_bytes else None}
+
+
+# Pre-merge name: messages already queued (e.g. ETA reminders) still resolve, as do old imports
+celery_app.tasks["app.workers.tasks.send_booking_email"] = send_email
+send_booking_email = send_email
+
+
+# Batches this large are abandoned once a third of their messages are refused
+BATCH_ABORT_MIN_SIZE = 30
+
+
+@celery_app.task(
+    name="app.workers.tasks.send_email_batch",
+    bind=True,
+    autoretry_for=(OSError,),  # connect/login failures: nothing sent yet
+    retry_backoff=True,
+    retry_jitter=True,
+    retry_kwargs={"max_retries": 5},
+)
+def send_email_batch(self, messages: list[dict]):
+    """
+    Send many emails over one pooled SMTP session.
+    Each message is a dict of send_email's kwargs (to_email, subject, body,
+    attachment_bytes, attachment_name). Refused recipients are recorded and
+    skipped; if the connection drops, only the unsent remainder is retried.
+    """
+    results = []
+    failed = 0
+    abort_at = len(messages) // 3 if len(messages) >= BATCH_ABORT_MIN_SIZE else None
+
+    with smtp_pool.connection(
+        settings.SMTP_HOST, settings.SMTP_PORT, settings.SMTP_USER, settings.SMTP_PASS
+    ) as conn:
+        for i, m in enumerate(messages):
+            msg = build_email_message(
+                from_email=settings.SMTP_USER,
+                to_email=m["to_email"],
+                subject=m["subject"],
+                body=m["body"],
+                attachment_bytes=m.get("attachment_bytes"),
+                attachment_name=m.get("attachment_name", "receipt.pdf"),
+            )
+            try:
+                conn.server.sendmail(settings.SMTP_USER, [m["to_email"]], msg.as_string())
+                conn.sent += 1
+                results.append({"to_email": m["to_email"], "ok": True})
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                failed += 1
+                results.append({"to_email": m["to_email"], "ok": False, "error": str(e)})
+                if abort_at is not None and failed >= abort_at:
+                    return {
+                        "ok": False,
+                        "aborted": True,
+                        "sent": i + 1 - failed,
+                        "failed": failed,
+                        "results": results,
+                    }
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                raise self.retry(args=(messages[i:],), exc=e)
+
+    return {"ok": failed == 0, "aborted": False, "sent": len(messages) - failed, "failed": failed, "results": results}
 
 
 @celery_app.task(
-    name="app.workers.tasks.send_booking_email",
+    name="app.workers.tasks.apply_razorpay_webhook",
     bind=True,
     autoretry_for=(Exception,),
     retry_backoff=True,
     retry_jitter=True,
     retry_kwargs={"max_retries": 5},
 )
-def send_booking_email(self, to_email: str, subject: str, body: str, attachment_bytes: Optional[bytes]=None, attachment_name: str="receipt.pdf"):
-    send_email_smtp(
-        host=settings.SMTP_HOST,
-        port=settings.SMTP_PORT,
-        username=settings.SMTP_USER,
-        password=settings.SMTP_PASS,
-        to_email=to_email,
-        subject=subject,
-        body=body,
-        attachment_bytes=attachment_bytes,
-        attachment_name=attachment_name,
-    )
-    return {"ok": True, "attachment_sha256": _hash_bytes(attachment_bytes) if attachment_bytes else None}
+def apply_razorpay_webhook(self, payload_json: dict):
+    """
+    Apply a signature-verified webhook after the endpoint has answered 200.
+    Safe to retry: apply_webhook_update skips events already stored.
+    """
+    try:
+        apply_webhook_update(payload_json)
+    except Exception:
+        logger.exception(
+            "razorpay webhook apply failed: event=%s event_id=%s attempt=%s",
+            payload_json.get("event"), webhook_event_id(payload_json), self.request.retries,
+        )
+        raise
+    return {"ok": True}
+
+
+# While Razorpay still reports "authorized" (not yet captured), check again this often,
+# up to RECONCILE_MAX_PENDING_CHECKS times (~2h), before leaving the payment AUTHORIZED.
+RECONCILE_PENDING_COUNTDOWN_SEC = 300
+RECONCILE_MAX_PENDING_CHECKS = 24
+
+
+@celery_app.task(
+    name="app.workers.tasks.reconcile_razorpay_payment",
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+    retry_kwargs={"max_retries": 5},
+)
+def reconcile_razorpay_payment(self, payment_id: str):
+    """
+    Settle a checkout-verified payment against Razorpay.
+    razorpay_verify only checks the signature and marks the payment AUTHORIZED;
+    the HTTP fetch and amount/currency checks happen here, and a CAPTURED
+    result hands off to process_successful_payment for the receipt.
+    The status write only applies to a payment that is still AUTHORIZED, so a
+    webhook/refund that lands during the fetch is never overwritten.
+    """
+    pay_id = uuid.UUID(payment_id)
+    db = SessionLocal()
+    try:
+        pay = db.scalar(select(Payment).where(Payment.id == pay_id))
+        if not pay or not pay.provider_payment_id:
+            return {"ok": False, "reason": "payment not found"}
+        if pay.status == PaymentStatus.CAPTURED:
+            # a previous run may have committed CAPTURED and then failed to enqueue the receipt
+            if pay.receipt_sent_at is None:
+                process_successful_payment.delay(payment_id)
+            return {"ok": True, "payment_status": pay.status}
+        if pay.status != PaymentStatus.AUTHORIZED:
+            return {"ok": True, "payment_status": pay.status}
+
+        tenant_id = pay.tenant_id
+        branch_id = pay.branch_id
+        appointment_id = pay.appointment_id
+        provider_order_id = pay.provider_order_id
+        provider_payment_id = pay.provider_payment_id
+        currency = pay.currency
+        amount_paisa = pay.amount_paisa
+        # end the read transaction; nothing is held open during the Razorpay call
+        db.rollback()
+
+        rp_payment = client.payment.fetch(provider_payment_id)
+        rp_status = rp_payment.get("status", "")
+        rp_amount_paisa = int(rp_payment.get("amount", 0))
+        rp_currency = rp_payment.get("currency", "")
+
+        if rp_currency != currency or rp_amount_paisa != amount_paisa:
+            status = PaymentStatus.FAILED
+        elif rp_status == "captured":
+            status = PaymentStatus.CAPTURED
+        elif rp_status == "authorized":
+            # not captured yet: look again later instead of settling on AUTHORIZED
+            if self.request.retries < RECONCILE_MAX_PENDING_CHECKS:
+                raise self.retry(countdown=RECONCILE_PENDING_COUNTDOWN_SEC, max_retries=RECONCILE_MAX_PENDING_CHECKS)
+            return {"ok": False, "reason": "still authorized", "payment_status": PaymentStatus.AUTHORIZED}
+        else:
+            status = PaymentStatus.FAILED
+
+        result = db.execute(
+            update(Payment)
+            .where(Payment.id == pay_id, Payment.status == PaymentStatus.AUTHORIZED)
+            .values(status=status)
+        )
+        if result.rowcount == 0:
+            # settled by a webhook/refund meanwhile; that status wins
+            db.rollback()
+            current = db.scalar(select(Payment).where(Payment.id == pay_id))
+            status = current.status if current else None
+            if status == PaymentStatus.CAPTURED and current.receipt_sent_at is None:
+                process_successful_payment.delay(payment_id)
+            return {"ok": True, "payment_status": status}
+
+        if status == PaymentStatus.CAPTURED:
+            db.execute(
+                update(Appointment)
+                .where(
+                    Appointment.tenant_id == tenant_id,
+                    Appointment.branch_id == branch_id,
+                    Appointment.id == appointment_id,
+                )
+                .values(payment_status=ApptPayStatus.PAID)
+            )
+
+        db.add(
+            PaymentEvent(
+                tenant_id=tenant_id,
+                provider=PaymentProvider.RAZORPAY,
+                event_type="payment.reconciled",
+                provider_event_id=None,
+                provider_order_id=provider_order_id,
+                provider_payment_id=provider_payment_id,
+                payload={"razorpay_payment": rp_payment},
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    # Receipt rendering + SMTP happen in their own task, after the status commit
+    if status == PaymentStatus.CAPTURED:
+        process_successful_payment.delay(payment_id)
+    return {"ok": True, "payment_status": status}
+
+
+@celery_app.task(
+    name="app.workers.tasks.process_successful_payment",
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+    retry_kwargs={"max_retries": 5},
+)
+def process_successful_payment(self, payment_id: str):
+    """Render and email the receipt for a CAPTURED payment (idempotent via receipt_sent_at)."""
+    db = SessionLocal()
+    try:
+        pay = db.scalar(select(Payment).where(Payment.id == uuid.UUID(payment_id)))
+        if not pay or pay.status != PaymentStatus.CAPTURED:
+            return {"ok": False, "reason": "payment not captured"}
+        if getattr(pay, "receipt_sent_at", None) is not None:
+            return {"ok": True, "receipt_sent": False}
+
+        customer = db.scalar(
+            select(Customer)
+            .join(Appointment, Appointment.customer_id == Customer.id)
+            .where(
+                Appointment.tenant_id == pay.tenant_id,
+                Appointment.id == pay.appointment_id,
+                Customer.tenant_id == pay.tenant_id,
+            )
+        )
+        receipt_no = str(pay.id)
+        amount = pay.amount
+        currency = pay.currency
+        customer_name = customer.full_name if customer else "Customer"
+        to_email = customer.email if customer and customer.email else "fallback@email.com"
+        # end the read transaction; no connection sits idle-in-transaction during PDF + SMTP
+        db.rollback()
+
+        pdf_bytes, pdf_sha256 = generate_receipt_pdf(
+            receipt_no=receipt_no,
+            customer_name=customer_name,
+            amount=amount,
+            currency=currency,
+        )
+
+        send_email_smtp(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER,
+            password=settings.SMTP_PASS,
+            to_email=to_email,
+            subject="Payment Receipt",
+            body="Your payment was successful. Receipt attached.",
+            attachment_bytes=pdf_bytes,
+            attachment_name=f"receipt_{receipt_no}.pdf",
+        )
+
+        pay.receipt_sent_at = datetime.utcnow()
+        db.commit()
+        return {"ok": True, "receipt_sent": True, "attachment_sha256": pdf_sha256}
+    finally:
+        db.close()